@@ -1,19 +1,48 @@
 # -*- coding: utf-8 -*-
-class HashMap(object):
-    def __init__(self, m, seed):
-        self.m = m
-        self.seed = seed
+from blake3 import blake3
 
-    def hash(self, value):
-        """
-        Hash Algorithm
-        :param value: Value
-        :return: Hash Value
-        """
-        ret = 0
-        for i in range(len(value)):
-            ret += self.seed * ret + ord(value[i])
-        return (self.m - 1) & ret
+# KEYS[1]: bloom key, ARGV[1]: number of offsets per value, ARGV[2:]: offsets.
+# Returns a list of 1/0 flags, 1 if the value already existed.
+CHECK_AND_ADD_SCRIPT = """
+local k = tonumber(ARGV[1])
+local seen = {}
+for i = 2, #ARGV, k do
+    local exists = 1
+    for j = i, i + k - 1 do
+        if redis.call("GETBIT", KEYS[1], ARGV[j]) == 0 then
+            exists = 0
+            break
+        end
+    end
+    if exists == 0 then
+        for j = i, i + k - 1 do
+            redis.call("SETBIT", KEYS[1], ARGV[j], 1)
+        end
+    end
+    seen[#seen + 1] = exists
+end
+return seen
+"""
+
+
+def bloom_offsets(value, m, hash_number):
+    """
+    bit offsets of value in a filter of m bits, derived from one 128-bit digest by double hashing: h1 + i * h2
+    :param value: str or bytes
+    :param m: filter size, a power of two
+    :param hash_number: the number of hash function
+    :return:
+    """
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    # Hash every value, even 16-byte fingerprints: the length alone does not
+    # tell a digest from a 16-char url, whose ascii bytes would be poor offsets.
+    digest = blake3(value).digest(length=16)
+    h1 = int.from_bytes(digest[:8], "little")
+    # An odd step visits every bit of the power-of-two sized filter.
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    mask = m - 1
+    return [(h1 + i * h2) & mask for i in range(hash_number)]
 
 
 class BloomFilter(object):
@@ -27,10 +56,18 @@ class BloomFilter(object):
         """
         # default to 1 << 30 = 10,7374,1824 = 2^30 = 128MB, max filter 2^30/hash_number = 1,7895,6970 fingerprints
         self.m = 1 << bit
-        self.seeds = range(hash_number)
+        self.hash_number = hash_number
         self.server = server
         self.key = key
-        self.hmaps = [HashMap(self.m, seed) for seed in self.seeds]
+        self.check_and_add_script = server.register_script(CHECK_AND_ADD_SCRIPT)
+
+    def offsets(self, value):
+        """
+        bit offsets of value
+        :param value:
+        :return:
+        """
+        return bloom_offsets(value, self.m, self.hash_number)
 
     def exists(self, value):
         """
@@ -40,11 +77,11 @@ class BloomFilter(object):
         """
         if not value:
             return False
-        exist = True
-        for hmap in self.hmaps:
-            offset = hmap.hash(value)
-            exist = exist & self.server.getbit(self.key, offset)
-        return exist
+        # One BITFIELD command with a GET subcommand per offset.
+        args = []
+        for offset in self.offsets(value):
+            args.extend(("GET", "u1", offset))
+        return all(self.server.execute_command("BITFIELD", self.key, *args))
 
     def insert(self, value):
         """
@@ -52,6 +89,56 @@ class BloomFilter(object):
         :param value:
         :return:
         """
-        for f in self.hmaps:
-            offset = f.hash(value)
-            self.server.setbit(self.key, offset, 1)
+        args = []
+        for offset in self.offsets(value):
+            args.extend(("SET", "u1", offset, 1))
+        self.server.execute_command("BITFIELD", self.key, *args)
+
+    def check_and_add(self, value):
+        """
+        add value to bloom, return if value already existed
+        :param value:
+        :return:
+        """
+        return self.check_and_add_many([value])[0]
+
+    def check_and_add_many(self, values):
+        """
+        add values to bloom atomically in one round trip
+        :param values:
+        :return: list of bool, True if the value already existed
+        """
+        if not values:
+            return []
+        args = [self.hash_number]
+        for value in values:
+            args.extend(self.offsets(value))
+        # A value repeated within the same batch is reported as existing.
+        return [bool(seen) for seen in self.check_and_add_script(keys=[self.key], args=args)]
+
+
+class LocalBloomFilter(object):
+    def __init__(self, bit=27, hash_number=6):
+        """
+        Initialize an in-process BloomFilter, unlike a LRU cache it never forgets a value
+        :param bit: m = 2 ^ bit, 27 is 16MB and holds about 1400W values at a 1% false positive rate
+        :param hash_number: the number of hash function
+        """
+        self.m = 1 << bit
+        self.hash_number = hash_number
+        self.bits = bytearray(max(self.m >> 3, 1))
+
+    def __contains__(self, value):
+        bits = self.bits
+        for offset in bloom_offsets(value, self.m, self.hash_number):
+            if not bits[offset >> 3] & (1 << (offset & 7)):
+                return False
+        return True
+
+    def add(self, value):
+        bits = self.bits
+        for offset in bloom_offsets(value, self.m, self.hash_number):
+            bits[offset >> 3] |= 1 << (offset & 7)
+
+    def clear(self):
+        self.bits = bytearray(len(self.bits))
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 import sys
 
+import redis
 import six
 from scrapy.utils.misc import load_object
 
@@ -19,7 +20,7 @@ if sys.version_info > (3,):
     SETTINGS_PARAMS_MAP["REDIS_DECODE_RESPONSES"] = "decode_responses"
 
 
-def get_redis_from_settings(settings):
+def get_redis_from_settings(settings, **kwargs):
     """Returns a redis client instance from given Scrapy settings object.
 
     This function uses ``get_client`` to instantiate the client and uses
@@ -30,6 +31,8 @@ def get_redis_from_settings(settings):
     ----------
     settings : Settings
         A scrapy settings object. See the supported settings below.
+    **kwargs
+        Extra client parameters, taking precedence over the settings.
 
     Returns
     -------
@@ -57,6 +60,7 @@ def get_redis_from_settings(settings):
         val = settings.get(source)
         if val:
             params[dest] = val
+    params.update(kwargs)
 
     # Allow ``redis_cls`` to be a path to a class.
     if isinstance(params.get("redis_cls"), six.string_types):
@@ -78,6 +82,8 @@ def get_redis(**kwargs):
         Defaults to ``redis.StrictRedis``.
     url : str, optional
         If given, ``redis_cls.from_url`` is used to instantiate the class.
+    single_connection_client : bool, optional
+        Whether the client holds one connection instead of using the pool per command.
     **kwargs
         Extra parameters to be passed to the ``redis_cls`` class.
 
@@ -90,6 +96,10 @@ def get_redis(**kwargs):
     redis_cls = kwargs.pop("redis_cls", defaults.REDIS_CLS)
     url = kwargs.pop("url", None)
     if url:
+        if kwargs.pop("single_connection_client", False):
+            # ``from_url`` passes extra parameters to the pool, not to the client.
+            return redis_cls(connection_pool=redis.ConnectionPool.from_url(url, **kwargs),
+                             single_connection_client=True)
         return redis_cls.from_url(url, **kwargs)
     else:
         return redis_cls(**kwargs)
@@ -174,15 +184,20 @@ def get_redis_sentinel(**kwargs):
     return redis_cls
 
 
-def from_settings(settings):
+def from_settings(settings, single_connection_client=False):
     """
     Select the connection method of redis according to the configuration in settings
 
     :param settings:
+    :param single_connection_client: bind the standalone client to one connection instead of
+        taking one from the pool on every command
     :return:
     """
     if "REDIS_SENTINELS" in settings:
         return get_redis_sentinel_from_settings(settings)
     elif "REDIS_STARTUP_NODES" in settings or "REDIS_CLUSTER_URL" in settings:
         return get_redis_cluster_from_settings(settings)
+    # Sentinel and cluster clients keep managing their own connection pools.
+    if single_connection_client:
+        return get_redis_from_settings(settings, single_connection_client=True)
     return get_redis_from_settings(settings)
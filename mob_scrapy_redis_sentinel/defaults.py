@@ -6,11 +6,38 @@ from redis.sentinel import Sentinel
 
 from mob_scrapy_redis_sentinel import inner_ip, mob_log
 
+# Fingerprints are 16-byte binary digests since v2, the suffix keeps them apart
+# from the 40-char hex fingerprints and bloom bits stored under the old keys.
+# The {...} hash tag puts a filter and its sibling keys (e.g. ``<key>:content``)
+# in one Redis Cluster slot, so scripts and multi-key commands stay on one node.
 # For standalone use.
-DUPEFILTER_KEY = "dupefilter:%(timestamp)s"
+DUPEFILTER_KEY = "{dupefilter:v2:%(timestamp)s}"
+# MongoDupeFilter collection names, MongoDB has no slots so they carry no hash tag.
+MONGO_DUPEFILTER_KEY = "%(spider)s:dupefilter:v2"
+# For standalone use.
+MONGO_DUPEFILTER_TIMESTAMP_KEY = "dupefilter:v2:%(timestamp)s"
+# Buffer fingerprints in memory and write them in batches of this size, 0 disables.
+# Used by MongoDupeFilter and RedisDupeFilter. Buffered and written fingerprints are
+# answered from the process, fingerprints other workers store meanwhile are not seen
+# in this mode, they are counted in the "dupefilter/late_duplicates" stats.
+DUPEFILTER_BATCH_SIZE = 0
+# Size of the in-process bloom filter holding every stored fingerprint when batching,
+# m = 2 ^ bit, 27 is 16MB for about 1400W fingerprints at a 1% false positive rate.
+DUPEFILTER_BATCH_BLOOM_BIT = 27
+# Seconds after which buffered fingerprints are written even if the batch is not full, 0 disables.
+DUPEFILTER_FLUSH_INTERVAL = 1.0
+# Number of recently seen fingerprints kept in process to skip the server round trip, 0 disables.
+DUPEFILTER_LOCAL_CACHE_SIZE = 1 << 17
+# Filtered requests counted before they are added to the "dupefilter/filtered" stats,
+# or "bloomfilter/filtered" for RedisBloomFilter.
+DUPEFILTER_STATS_FLUSH_COUNT = 100
 
 PIPELINE_KEY = "%(spider)s:items"
 
+# RedisContentDupePipeline keeps its bloom filter next to the dupefilter,
+# under ``<SCHEDULER_DUPEFILTER_KEY>:content``. m = 2 ^ 24 bits (2 MB) per spider.
+CONTENT_DUPEFILTER_BIT = 24
+
 STATS_KEY = '%(spider)s:stats'
 
 REDIS_CLS = redis.StrictRedis
@@ -28,7 +55,7 @@ REDIS_PARAMS = {
 
 SCHEDULER_QUEUE_KEY = "%(spider)s:requests"
 SCHEDULER_QUEUE_CLASS = "mob_scrapy_redis_sentinel.queue.PriorityQueue"
-SCHEDULER_DUPEFILTER_KEY = "%(spider)s:dupefilter"
+SCHEDULER_DUPEFILTER_KEY = "{%(spider)s}:dupefilter:v2"
 SCHEDULER_DUPEFILTER_CLASS = "mob_scrapy_redis_sentinel.dupefilter.RedisDupeFilter"
 
 SCHEDULER_PERSIST = False
@@ -1,99 +1,339 @@
 # -*- coding: utf-8 -*-
 import logging
+import threading
 import time
 
 import pymongo
-from pymongo.errors import DuplicateKeyError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
 from scrapy.dupefilters import BaseDupeFilter
-from scrapy.utils.request import request_fingerprint
 
 from . import defaults
-from .bloomfilter import BloomFilter
+from .bloomfilter import BloomFilter, LocalBloomFilter
 from .connection import from_settings
+from .utils import LRUSet, request_fingerprint
 
 logger = logging.getLogger(__name__)
 
 
-class MongoDupeFilter(BaseDupeFilter):
-    def __init__(self, mongo_uri, db, collection, debug=False, *args, **kwargs):
+def get_dupefilter_params(settings):
+    """Returns the dupefilter keyword arguments read from given settings."""
+    return {
+        "debug": settings.getbool("DUPEFILTER_DEBUG", False),
+        "local_cache_size": settings.getint("DUPEFILTER_LOCAL_CACHE_SIZE", defaults.DUPEFILTER_LOCAL_CACHE_SIZE),
+        "batch_size": settings.getint("DUPEFILTER_BATCH_SIZE", defaults.DUPEFILTER_BATCH_SIZE),
+        "flush_interval": settings.getfloat("DUPEFILTER_FLUSH_INTERVAL", defaults.DUPEFILTER_FLUSH_INTERVAL),
+        "stats_flush_count": settings.getint("DUPEFILTER_STATS_FLUSH_COUNT", defaults.DUPEFILTER_STATS_FLUSH_COUNT),
+        "batch_bloom_bit": settings.getint("DUPEFILTER_BATCH_BLOOM_BIT", defaults.DUPEFILTER_BATCH_BLOOM_BIT),
+    }
+
+
+class _FilteredStatsMixin(object):
+    """Logs filtered requests and adds them to the stats in batches."""
+
+    __slots__ = ("stats_flush_count", "_dup_count", "_dup_spider", "_late_count")
+
+    stats_key = "dupefilter/filtered"
+    late_stats_key = "dupefilter/late_duplicates"
+
+    def _init_stats(self, stats_flush_count):
+        # Filtered requests are counted here and added to the stats in batches.
+        self.stats_flush_count = stats_flush_count
+        self._dup_count = 0
+        self._dup_spider = None
+        self._late_count = 0
+
+    def log(self, request, spider):
+        """Logs given request.
+
+        Parameters
+        ----------
+        request : scrapy.http.Request
+        spider : scrapy.spiders.Spider
+
+        """
+        if self.debug:
+            msg = "Filtered duplicate request: %(request)s"
+            self.logger.debug(msg, {"request": request}, extra={"spider": spider})
+        elif self.logdupes:
+            msg = (
+                "Filtered duplicate request %(request)s"
+                " - no more duplicates will be shown"
+                " (see DUPEFILTER_DEBUG to show all duplicates)"
+            )
+            self.logger.debug(msg, {"request": request}, extra={"spider": spider})
+            self.logdupes = False
+
+        self._dup_spider = spider
+        self._dup_count += 1
+        if self._dup_count >= self.stats_flush_count:
+            self.flush_stats()
+
+    def flush_stats(self):
+        """Adds the filtered requests counted since the last flush to the stats."""
+        if self._dup_count:
+            self._dup_spider.crawler.stats.inc_value(self.stats_key, self._dup_count, spider=self._dup_spider)
+            self._dup_count = 0
+        if self._late_count and self._dup_spider is not None:
+            self._dup_spider.crawler.stats.inc_value(self.late_stats_key, self._late_count, spider=self._dup_spider)
+            self._late_count = 0
+
+
+class _WriteBehindMixin(object):
+    """Buffers new fingerprints in process and writes them in batches."""
+
+    __slots__ = ()
+
+    def _init_write_behind(self, batch_size, flush_interval, batch_bloom_bit):
+        if batch_size > 0 and batch_bloom_bit <= 0:
+            raise ValueError("DUPEFILTER_BATCH_SIZE needs DUPEFILTER_BATCH_BLOOM_BIT > 0")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = set()
+        self._flush_call = None
+        # Batching answers from the process. The LRU cache evicts, an evicted
+        # fingerprint would be new again, so every written one also goes here.
+        self._written = LocalBloomFilter(batch_bloom_bit) if batch_size > 0 else None
+
+    def _buffer_seen(self, fp):
+        if fp in self._pending or fp in self._written:
+            return True
+        self._pending.add(fp)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+        elif self._flush_call is None and self.flush_interval > 0:
+            from twisted.internet import reactor
+            self._flush_call = reactor.callLater(self.flush_interval, self.flush)
+        return False
+
+    def _take_pending(self):
+        if self._flush_call is not None:
+            if self._flush_call.active():
+                self._flush_call.cancel()
+            self._flush_call = None
+        pending, self._pending = self._pending, set()
+        return pending
+
+    def _written_back(self, pending, late_count):
+        for fp in pending:
+            self._written.add(fp)
+            self._local.add(fp)
+        if late_count:
+            # Another worker stored these first, their requests were enqueued twice.
+            self.logger.debug("%d written fingerprints were already stored", late_count)
+            self._late_count += late_count
+
+
+class MongoDupeFilter(_FilteredStatsMixin, _WriteBehindMixin, BaseDupeFilter):
+    # BaseDupeFilter has no __slots__, so instances keep a __dict__, but the
+    # attributes used on every request_seen live in slots.
+    __slots__ = ("mongo", "mongo_db", "collection", "debug", "logdupes", "persist", "batch_size", "flush_interval",
+                 "_pending", "_flush_call", "_written", "_local", "_coll", "_update_one", "_index_ready", "_index_error",
+                 "_index_pending")
+
+    logger = logger
+    # Seconds a write waits for the fp index before failing, and between progress logs.
+    index_wait_timeout = 600
+    index_wait_log_interval = 10
+
+    def __init__(self, mongo_uri, db, collection, debug=False, batch_size=defaults.DUPEFILTER_BATCH_SIZE,
+                 local_cache_size=defaults.DUPEFILTER_LOCAL_CACHE_SIZE, persist=defaults.SCHEDULER_PERSIST,
+                 flush_interval=defaults.DUPEFILTER_FLUSH_INTERVAL,
+                 stats_flush_count=defaults.DUPEFILTER_STATS_FLUSH_COUNT,
+                 batch_bloom_bit=defaults.DUPEFILTER_BATCH_BLOOM_BIT, *args, **kwargs):
         self.mongo = pymongo.MongoClient(mongo_uri)
         self.mongo_db = db
         self.collection = collection
         self.debug = debug
         self.logdupes = True
-        self.mongo[self.mongo_db][self.collection].create_index("fp", unique=True)
+        self._init_stats(stats_flush_count)
+        self.persist = persist
+        self._init_write_behind(batch_size, flush_interval, batch_bloom_bit)
+        self._local = LRUSet(local_cache_size)
+        self._coll = self.mongo[self.mongo_db][self.collection]
+        self._update_one = self._coll.update_one
+        self._index_ready = threading.Event()
+        self._index_error = None
+        # Checking and building the index talks to the server, and the build
+        # takes minutes on a large collection, so both run off the spider
+        # start. Writes wait for it in _wait_index.
+        self._index_pending = True
+        threading.Thread(target=self._build_index, name="fp-index-%s" % collection, daemon=True).start()
+        if batch_size > 0:
+            # Fingerprints of earlier runs are only in the collection, read them once.
+            for doc in self._coll.find({}, {"fp": 1, "_id": 0}).batch_size(10000):
+                self._written.add(doc["fp"])
 
     @classmethod
     def from_settings(cls, settings):
-        mongo_uri = settings.get("MongoFilter_URI")
-        mongo_db = settings.get("MongoFilter_DB")
-        collection = defaults.DUPEFILTER_KEY % {"timestamp": int(time.time())}
-        debug = settings.getbool("DUPEFILTER_DEBUG", False)
-        return cls(mongo_uri=mongo_uri, db=mongo_db, collection=collection, debug=debug)
+        # XXX: This creates a one-time collection, see RedisDupeFilter.from_settings.
+        collection = defaults.MONGO_DUPEFILTER_TIMESTAMP_KEY % {"timestamp": int(time.time())}
+        return cls._from_settings(settings, collection)
 
     @classmethod
     def from_crawler(cls, crawler):
-        return cls.from_settings(crawler.settings)
+        # One collection per spider, like from_spider, so spiders of a project
+        # neither share fingerprints nor drop each other's on close.
+        return cls._from_settings(crawler.settings, cls._spider_collection(crawler.settings, crawler.spidercls.name))
+
+    @classmethod
+    def _spider_collection(cls, settings, spider_name):
+        dupefilter_key = settings.get("MongoFilter_KEY", defaults.MONGO_DUPEFILTER_KEY)
+        return dupefilter_key % {"spider": spider_name}
+
+    @classmethod
+    def _from_settings(cls, settings, collection):
+        mongo_uri = settings.get("MongoFilter_URI")
+        mongo_db = settings.get("MongoFilter_DB")
+        persist = settings.getbool("SCHEDULER_PERSIST", defaults.SCHEDULER_PERSIST)
+        return cls(mongo_uri=mongo_uri, db=mongo_db, collection=collection, persist=persist,
+                   **get_dupefilter_params(settings))
 
     def request_seen(self, request):
         fp = self.request_fingerprint(request)
-        # This returns the number of values added, zero if already exists.
-        doc = self.mongo[self.mongo_db][self.collection].find_one({"fp": fp})
-        if doc:
+        if fp in self._local:
             return True
+        if self.batch_size:
+            return self._buffer_seen(fp)
+        if self._index_pending:
+            self._wait_index()
+        # Binary fingerprints are stored as BinData.
+        # The upsert only inserts when the fingerprint is missing, so a new
+        # fingerprint is the one that got an upserted id.
         try:
-            self.mongo[self.mongo_db][self.collection].insert_one({"fp": fp})
+            res = self._update_one({"fp": fp}, {"$setOnInsert": {"fp": fp}}, upsert=True)
         except DuplicateKeyError:
-            pass
-        return False
+            # Before MongoDB 4.2 an upsert racing with another worker's insert
+            # is not retried by the server.
+            self._local.add(fp)
+            return True
+        self._local.add(fp)
+        return res.upserted_id is None
+
+    def request_seen_many(self, requests):
+        """Returns whether each request was already seen, using one unordered bulk write."""
+        fps = [self.request_fingerprint(request) for request in requests]
+        if self.batch_size:
+            return [fp in self._local or self._buffer_seen(fp) for fp in fps]
+        seen = [True] * len(fps)
+        first = {}
+        for i, fp in enumerate(fps):
+            # Repeats within the batch are duplicates of their first occurrence.
+            if fp not in self._local and fp not in first:
+                first[fp] = i
+        if not first:
+            return seen
+        if self._index_pending:
+            self._wait_index()
+        pending = list(first.values())
+        ops = [UpdateOne({"fp": fps[i]}, {"$setOnInsert": {"fp": fps[i]}}, upsert=True) for i in pending]
+        try:
+            upserted = self._coll.bulk_write(ops, ordered=False).upserted_ids
+        except BulkWriteError as e:
+            # Duplicate key errors are upserts that raced with another worker.
+            if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+                raise
+            upserted = {upsert["index"]: upsert["_id"] for upsert in e.details["upserted"]}
+        for op_index, i in enumerate(pending):
+            seen[i] = op_index not in upserted
+            self._local.add(fps[i])
+        return seen
 
     def request_fingerprint(self, request):
         return request_fingerprint(request)
 
+    def _has_index(self):
+        # The collection is kept across runs, only create the index when missing.
+        return any(dict(index["key"]) == {"fp": 1} for index in self._coll.list_indexes())
+
+    def _create_index(self):
+        # Fingerprints are 16-byte BinData keys. The index stays a unique
+        # ascending one: MongoDB does not allow unique hashed indexes, and the
+        # upsert relies on uniqueness.
+        self._coll.create_index([("fp", pymongo.ASCENDING)], unique=True, background=True, name="fp_unique")
+
+    def _build_index(self):
+        try:
+            if not self._has_index():
+                self._create_index()
+        except Exception as e:
+            # E11000 here means the collection already holds duplicates.
+            logger.error("Failed to create fp index on %s: %s", self.collection, e)
+            self._index_error = e
+        finally:
+            self._index_ready.set()
+
+    def _wait_index(self):
+        # Without the unique index concurrent upserts insert duplicates and
+        # every lookup scans the collection, so no write goes out before it.
+        # This blocks the reactor: on a large collection without the index the
+        # crawl stalls until the build is done, at most index_wait_timeout.
+        waited = 0
+        while self._index_error is None and not self._index_ready.wait(self.index_wait_log_interval):
+            waited += self.index_wait_log_interval
+            if waited >= self.index_wait_timeout:
+                # Later writes fail at once instead of stalling again.
+                self._index_error = RuntimeError("fp index on %s not ready after %ds" % (self.collection, waited))
+                break
+            logger.warning("Waiting for the fp index on %s (%ds)", self.collection, waited)
+        if self._index_error is not None:
+            raise self._index_error
+        self._index_pending = False
+
     @classmethod
     def from_spider(cls, spider):
-        settings = spider.settings
-        mongo_uri = settings.get("MongoFilter_URI")
-        mongo_db = settings.get("MongoFilter_DB")
-        dupefilter_key = settings.get("SCHEDULER_DUPEFILTER_KEY", defaults.SCHEDULER_DUPEFILTER_KEY)
-        collection = dupefilter_key % {"spider": spider.name}
-        debug = settings.getbool("DUPEFILTER_DEBUG")
-        return cls(mongo_uri=mongo_uri, db=mongo_db, collection=collection, debug=debug)
+        return cls._from_settings(spider.settings, cls._spider_collection(spider.settings, spider.name))
+
+    def flush(self):
+        """Writes buffered fingerprints in one unordered bulk insert, and buffered stats."""
+        self.flush_stats()
+        if not self._pending:
+            return
+        if self._index_pending:
+            self._wait_index()
+        pending = self._take_pending()
+        late_count = 0
+        try:
+            self._coll.insert_many([{"fp": fp} for fp in pending], ordered=False)
+        except BulkWriteError as e:
+            # Duplicate key errors are fingerprints already stored by another worker.
+            if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+                raise
+            late_count = len(e.details["writeErrors"])
+        # Inserted and duplicate fingerprints alike are stored now.
+        self._written_back(pending, late_count)
 
     def close(self, reason=""):
-        self.clear()
+        self.flush()
+        if not self.persist:
+            self.clear()
 
     def clear(self):
-        self.mongo.drop_collection(self.collection)
-
-    def log(self, request, spider):
-        if self.debug:
-            msg = "Filtered duplicate request: %(request)s"
-            self.logger.debug(msg, {"request": request}, extra={"spider": spider})
-        elif self.logdupes:
-            msg = (
-                "Filtered duplicate request %(request)s"
-                " - no more duplicates will be shown"
-                " (see DUPEFILTER_DEBUG to show all duplicates)"
-            )
-            self.logger.debug(msg, {"request": request}, extra={"spider": spider})
-            self.logdupes = False
-
-        spider.crawler.stats.inc_value("dupefilter/filtered", spider=spider)
+        self._take_pending()
+        if self._written is not None:
+            self._written.clear()
+        self._local.clear()
+        self._coll.drop()
 
 
 # TODO: Rename class to RedisDupeFilter.
-class RedisDupeFilter(BaseDupeFilter):
+class RedisDupeFilter(_FilteredStatsMixin, _WriteBehindMixin, BaseDupeFilter):
     """Redis-based request duplicates filter.
 
     This class can also be used with default Scrapy's scheduler.
 
     """
 
+    __slots__ = ("server", "key", "debug", "logdupes", "batch_size", "flush_interval", "_pending", "_flush_call",
+                 "_written", "_local", "_sadd")
+
     logger = logger
 
-    def __init__(self, server, key, debug=False, *args, **kwargs):
+    def __init__(self, server, key, debug=False, local_cache_size=defaults.DUPEFILTER_LOCAL_CACHE_SIZE,
+                 batch_size=defaults.DUPEFILTER_BATCH_SIZE, flush_interval=defaults.DUPEFILTER_FLUSH_INTERVAL,
+                 stats_flush_count=defaults.DUPEFILTER_STATS_FLUSH_COUNT,
+                 batch_bloom_bit=defaults.DUPEFILTER_BATCH_BLOOM_BIT, *args, **kwargs):
         """Initialize the duplicates filter.
 
         Parameters
@@ -104,18 +344,40 @@ class RedisDupeFilter(BaseDupeFilter):
             Redis key Where to store fingerprints.
         debug : bool, optional
             Whether to log filtered requests.
+        local_cache_size : int, optional
+            Number of recently seen fingerprints kept in process.
+        batch_size : int, optional
+            Number of new fingerprints buffered before writing them in one
+            pipeline, 0 writes each one before answering.
+        flush_interval : float, optional
+            Seconds after which buffered fingerprints are written even if the
+            batch is not full, 0 disables.
+        stats_flush_count : int, optional
+            Filtered requests counted before they are added to the stats.
+        batch_bloom_bit : int, optional
+            Size of the in-process bloom filter remembering written
+            fingerprints when batching, m = 2 ^ bit.
 
         """
         self.server = server
         self.key = key
         self.debug = debug
         self.logdupes = True
+        self._init_stats(stats_flush_count)
+        self._local = LRUSet(local_cache_size)
+        self._init_write_behind(batch_size, flush_interval, batch_bloom_bit)
+        if batch_size > 0:
+            # Fingerprints of earlier runs are only in Redis, read them once.
+            for fp in server.sscan_iter(key, count=10000):
+                self._written.add(fp)
+        # Bound once, request_seen is called for every request.
+        self._sadd = server.sadd
 
     @classmethod
     def from_settings(cls, settings):
         """Returns an instance from given settings.
 
-        This uses by default the key ``dupefilter:<timestamp>``. When using the
+        This uses by default the key ``{dupefilter:v2:<timestamp>}``. When using the
         ``scrapy_redis.scheduler.Scheduler`` class, this method is not used as
         it needs to pass the spider name in the key.
 
@@ -130,14 +392,14 @@ class RedisDupeFilter(BaseDupeFilter):
 
 
         """
-        server = from_settings(settings)
+        # The filter owns this client, so it can hold a single connection.
+        server = from_settings(settings, single_connection_client=True)
         # XXX: This creates one-time key. needed to support to use this
         # class as standalone dupefilter with scrapy's default scheduler
         # if scrapy passes spider on open() method this wouldn't be needed
         # TODO: Use SCRAPY_JOB env as default and fallback to timestamp.
         key = defaults.DUPEFILTER_KEY % {"timestamp": int(time.time())}
-        debug = settings.getbool("DUPEFILTER_DEBUG")
-        return cls(server, key=key, debug=debug)
+        return cls(server, key=key, **get_dupefilter_params(settings))
 
     @classmethod
     def from_crawler(cls, crawler):
@@ -168,10 +430,68 @@ class RedisDupeFilter(BaseDupeFilter):
 
         """
         fp = self.request_fingerprint(request)
+        if fp in self._local:
+            return True
+        if self.batch_size:
+            return self._buffer_seen(fp)
         # This returns the number of values added, zero if already exists.
-        added = self.server.sadd(self.key, fp)
+        added = self._sadd(self.key, fp)
+        self._local.add(fp)
         return added == 0
 
+    def request_seen_many(self, requests):
+        """Returns whether each request was already seen, in one round trip.
+
+        Parameters
+        ----------
+        requests : list of scrapy.http.Request
+
+        Returns
+        -------
+        list of bool
+
+        """
+        return self.check_many([self.request_fingerprint(request) for request in requests])
+
+    def flush(self):
+        """Writes buffered fingerprints in one pipeline, and buffered stats."""
+        self.flush_stats()
+        pending = self._take_pending()
+        if not pending:
+            return
+        with self.server.pipeline(transaction=False) as pipe:
+            for fp in pending:
+                pipe.sadd(self.key, fp)
+            # SADD replies 0 for a fingerprint that was already in the set.
+            late_count = pipe.execute().count(0)
+        self._written_back(pending, late_count)
+
+    def check_many(self, fps):
+        """Returns whether each fingerprint was already seen, in one round trip.
+
+        Parameters
+        ----------
+        fps : list of bytes
+
+        Returns
+        -------
+        list of bool
+
+        """
+        if self.batch_size:
+            return [fp in self._local or self._buffer_seen(fp) for fp in fps]
+        seen = [fp in self._local for fp in fps]
+        pending = [i for i, fp_seen in enumerate(seen) if not fp_seen]
+        if not pending:
+            return seen
+        with self.server.pipeline(transaction=False) as pipe:
+            for i in pending:
+                pipe.sadd(self.key, fps[i])
+            for i, added in zip(pending, pipe.execute()):
+                seen[i] = added == 0
+                self._local.add(fps[i])
+        return seen
+
     def request_fingerprint(self, request):
         """Returns a fingerprint for a given request.
 
@@ -181,7 +501,7 @@ class RedisDupeFilter(BaseDupeFilter):
 
         Returns
         -------
-        str
+        bytes
 
         """
         return request_fingerprint(request)
@@ -189,11 +509,11 @@ class RedisDupeFilter(BaseDupeFilter):
     @classmethod
     def from_spider(cls, spider):
         settings = spider.settings
-        server = from_settings(settings)
+        # The filter owns this client, so it can hold a single connection.
+        server = from_settings(settings, single_connection_client=True)
         dupefilter_key = settings.get("SCHEDULER_DUPEFILTER_KEY", defaults.SCHEDULER_DUPEFILTER_KEY)
         key = dupefilter_key % {"spider": spider.name}
-        debug = settings.getbool("DUPEFILTER_DEBUG")
-        return cls(server, key=key, debug=debug)
+        return cls(server, key=key, **get_dupefilter_params(settings))
 
     def close(self, reason=""):
         """Delete data on close. Called by Scrapy's scheduler.
@@ -203,46 +523,32 @@ class RedisDupeFilter(BaseDupeFilter):
         reason : str, optional
 
         """
+        self.flush()
         self.clear()
 
     def clear(self):
         """Clears fingerprints data."""
+        self._local.clear()
+        self._take_pending()
+        if self._written is not None:
+            self._written.clear()
         self.server.delete(self.key)
 
-    def log(self, request, spider):
-        """Logs given request.
-
-        Parameters
-        ----------
-        request : scrapy.http.Request
-        spider : scrapy.spiders.Spider
-
-        """
-        if self.debug:
-            msg = "Filtered duplicate request: %(request)s"
-            self.logger.debug(msg, {"request": request}, extra={"spider": spider})
-        elif self.logdupes:
-            msg = (
-                "Filtered duplicate request %(request)s"
-                " - no more duplicates will be shown"
-                " (see DUPEFILTER_DEBUG to show all duplicates)"
-            )
-            self.logger.debug(msg, {"request": request}, extra={"spider": spider})
-            self.logdupes = False
-
-        spider.crawler.stats.inc_value("dupefilter/filtered", spider=spider)
-
 
-class RedisBloomFilter(BaseDupeFilter):
+class RedisBloomFilter(_FilteredStatsMixin, BaseDupeFilter):
     """Redis-based request duplicates filter.
 
     This class can also be used with default Scrapy's scheduler.
 
     """
 
+    __slots__ = ("server", "key", "debug", "logdupes", "bit", "hash_number", "bf", "_local", "_bf_check_and_add")
+
     logger = logger
+    stats_key = "bloomfilter/filtered"
 
-    def __init__(self, server, key, debug, bit, hash_number):
+    def __init__(self, server, key, debug, bit, hash_number, local_cache_size=defaults.DUPEFILTER_LOCAL_CACHE_SIZE,
+                 stats_flush_count=defaults.DUPEFILTER_STATS_FLUSH_COUNT, *args, **kwargs):
         """Initialize the duplicates filter.
 
         Parameters
@@ -253,21 +559,29 @@ class RedisBloomFilter(BaseDupeFilter):
             Redis key Where to store fingerprints.
         debug : bool, optional
             Whether to log filtered requests.
+        local_cache_size : int, optional
+            Number of recently seen fingerprints kept in process.
+        stats_flush_count : int, optional
+            Filtered requests counted before they are added to the stats.
 
         """
         self.server = server
         self.key = key
         self.debug = debug
         self.logdupes = True
+        self._init_stats(stats_flush_count)
+        self._local = LRUSet(local_cache_size)
         self.bit = bit
         self.hash_number = hash_number
         self.bf = BloomFilter(server, self.key, bit, hash_number)
+        # Bound once, request_seen is called for every request.
+        self._bf_check_and_add = self.bf.check_and_add
 
     @classmethod
     def from_settings(cls, settings):
         """Returns an instance from given settings.
 
-        This uses by default the key ``dupefilter:<timestamp>``. When using the
+        This uses by default the key ``{dupefilter:v2:<timestamp>}``. When using the
         ``mob_scrapy_redis_sentinel.scheduler.Scheduler`` class, this method is not used as
         it needs to pass the spider name in the key.
 
@@ -282,16 +596,16 @@ class RedisBloomFilter(BaseDupeFilter):
 
 
         """
-        server = from_settings(settings)
+        # The filter owns this client, so it can hold a single connection.
+        server = from_settings(settings, single_connection_client=True)
         # XXX: This creates one-time key. needed to support to use this
         # class as standalone dupefilter with scrapy's default scheduler
         # if scrapy passes spider on open() method this wouldn't be needed
         # TODO: Use SCRAPY_JOB env as default and fallback to timestamp.
         key = defaults.DUPEFILTER_KEY % {"timestamp": int(time.time())}
-        debug = settings.getbool("DUPEFILTER_DEBUG", False)
         bit = settings.getint("BLOOMFILTER_BIT", 30)
         hash_number = settings.getint("BLOOMFILTER_HASH_NUMBER", 6)
-        return cls(server=server, key=key, debug=debug, bit=bit, hash_number=hash_number)
+        return cls(server=server, key=key, bit=bit, hash_number=hash_number, **get_dupefilter_params(settings))
 
     @classmethod
     def from_crawler(cls, crawler):
@@ -322,10 +636,47 @@ class RedisBloomFilter(BaseDupeFilter):
 
         """
         fp = self.request_fingerprint(request)
-        if self.bf.exists(fp):
+        if fp in self._local:
             return True
-        self.bf.insert(fp)
-        return False
+        # Check and insert atomically in one round trip.
+        seen = self._bf_check_and_add(fp)
+        self._local.add(fp)
+        return seen
+
+    def request_seen_many(self, requests):
+        """Returns whether each request was already seen, in one round trip.
+
+        Parameters
+        ----------
+        requests : list of scrapy.http.Request
+
+        Returns
+        -------
+        list of bool
+
+        """
+        return self.check_many([self.request_fingerprint(request) for request in requests])
+
+    def check_many(self, fps):
+        """Returns whether each fingerprint was already seen, in one round trip.
+
+        Parameters
+        ----------
+        fps : list of bytes
+
+        Returns
+        -------
+        list of bool
+
+        """
+        seen = [fp in self._local for fp in fps]
+        pending = [i for i, fp_seen in enumerate(seen) if not fp_seen]
+        if not pending:
+            return seen
+        for i, fp_seen in zip(pending, self.bf.check_and_add_many([fps[i] for i in pending])):
+            seen[i] = fp_seen
+            self._local.add(fps[i])
+        return seen
 
     def request_fingerprint(self, request):
         """Returns a fingerprint for a given request.
@@ -336,7 +687,7 @@ class RedisBloomFilter(BaseDupeFilter):
 
         Returns
         -------
-        str
+        bytes
 
         """
         return request_fingerprint(request)
@@ -349,30 +700,14 @@ class RedisBloomFilter(BaseDupeFilter):
         reason : str, optional
 
         """
+        self.flush()
         self.clear()
 
+    def flush(self):
+        """Writes buffered stats."""
+        self.flush_stats()
+
     def clear(self):
         """Clears fingerprints data."""
+        self._local.clear()
         self.server.delete(self.key)
-
-    def log(self, request, spider):
-        """Logs given request.
-
-        Parameters
-        ----------
-        request : scrapy.http.Request
-        spider : scrapy.spiders.Spider
-
-        """
-        if self.debug:
-            msg = "Filtered duplicate request: %(request)s"
-            self.logger.debug(msg, {"request": request}, extra={"spider": spider})
-        elif self.logdupes:
-            msg = (
-                "Filtered duplicate request %(request)s"
-                " - no more duplicates will be shown"
-                " (see DUPEFILTER_DEBUG to show all duplicates)"
-            )
-            self.logger.debug(msg, {"request": request}, extra={"spider": spider})
-            self.logdupes = False
-        spider.crawler.stats.inc_value("bloomfilter/filtered", spider=spider)
@@ -1,9 +1,13 @@
 # -*- coding: utf-8 -*-
+from blake3 import blake3
+from scrapy.exceptions import DropItem
 from scrapy.utils.misc import load_object
 from scrapy.utils.serialize import ScrapyJSONEncoder
 from twisted.internet.threads import deferToThread
 
 from . import connection, defaults
+from .bloomfilter import BloomFilter
+from .utils import content_digest
 
 default_serialize = ScrapyJSONEncoder().encode
 
@@ -68,3 +72,104 @@ class RedisPipeline(object):
 
         """
         return self.key % {"spider": spider.name}
+
+
+class RedisContentDupePipeline(object):
+    """Drops items whose normalized page content was already seen.
+
+    Pages served under different urls (session ids, mirrors) pass the
+    request dupefilter, this drops their items before they are stored. The
+    content digests are kept in a bloom filter under
+    ``<SCHEDULER_DUPEFILTER_KEY>:content``.
+
+    Settings
+    --------
+    CONTENT_DUPEFILTER_FIELD : str
+        Item field holding the page body, normalized before hashing. Items
+        without it are hashed as serialized.
+    CONTENT_DUPEFILTER_BIT : int
+        Bloom filter size, m = 2 ^ bit.
+    BLOOMFILTER_HASH_NUMBER : int
+        Number of hash functions.
+    SCHEDULER_PERSIST : bool
+        Whether to keep the content digests when the spider closes.
+
+    """
+
+    def __init__(self, server, key=defaults.SCHEDULER_DUPEFILTER_KEY + ":content",
+                 bit=defaults.CONTENT_DUPEFILTER_BIT, hash_number=6, field=None, persist=defaults.SCHEDULER_PERSIST,
+                 serialize_func=default_serialize):
+        """Initialize pipeline.
+
+        Parameters
+        ----------
+        server : StrictRedis
+            Redis client instance.
+        key : str
+            Redis key of the bloom filter, formatted with the spider name.
+        bit : int
+            Bloom filter size, m = 2 ^ bit.
+        hash_number : int
+            Number of hash functions.
+        field : str, optional
+            Item field holding the page body.
+        persist : bool
+            Whether to keep the bloom filter on close.
+        serialize_func : callable
+            Items serializer function, used for items without ``field``.
+
+        """
+        self.server = server
+        self.key = key
+        self.bit = bit
+        self.hash_number = hash_number
+        self.field = field
+        self.persist = persist
+        self.serialize = serialize_func
+        self.bf = None
+
+    @classmethod
+    def from_settings(cls, settings):
+        dupefilter_key = settings.get("SCHEDULER_DUPEFILTER_KEY", defaults.SCHEDULER_DUPEFILTER_KEY)
+        params = {
+            "server": connection.from_settings(settings),
+            "key": dupefilter_key + ":content",
+            "bit": settings.getint("CONTENT_DUPEFILTER_BIT", defaults.CONTENT_DUPEFILTER_BIT),
+            "hash_number": settings.getint("BLOOMFILTER_HASH_NUMBER", 6),
+            "field": settings.get("CONTENT_DUPEFILTER_FIELD"),
+            "persist": settings.getbool("SCHEDULER_PERSIST", defaults.SCHEDULER_PERSIST),
+        }
+        if settings.get("REDIS_ITEMS_SERIALIZER"):
+            params["serialize_func"] = load_object(settings["REDIS_ITEMS_SERIALIZER"])
+
+        return cls(**params)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls.from_settings(crawler.settings)
+
+    def open_spider(self, spider):
+        self.bf = BloomFilter(self.server, self.key % {"spider": spider.name}, self.bit, self.hash_number)
+
+    def close_spider(self, spider):
+        if not self.persist:
+            self.server.delete(self.bf.key)
+
+    def process_item(self, item, spider):
+        return deferToThread(self._process_item, item, spider)
+
+    def _process_item(self, item, spider):
+        if self.bf.check_and_add(self.item_digest(item)):
+            raise DropItem("Duplicate page content")
+        return item
+
+    def item_digest(self, item):
+        """Returns the 16-byte content digest of given item.
+
+        Override this function to hash only selected fields.
+
+        """
+        body = item.get(self.field) if self.field else None
+        if body is None:
+            return blake3(self.serialize(item).encode("utf-8")).digest(length=16)
+        return content_digest(body)
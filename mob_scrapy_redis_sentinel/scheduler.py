@@ -7,6 +7,7 @@ from scrapy.utils.misc import load_object
 from . import connection, defaults
 
 from mob_scrapy_redis_sentinel import mob_log
+from mob_scrapy_redis_sentinel.dupefilter import get_dupefilter_params
 from mob_scrapy_redis_sentinel.utils import get_track_id
 
 
@@ -144,9 +145,9 @@ class Scheduler(object):
             self.df = load_object(self.dupefilter_cls)(
                 server=self.server,
                 key=self.dupefilter_key % {"spider": spider.name},
-                debug=spider.settings.getbool("DUPEFILTER_DEBUG", False),
                 bit=spider.settings.getint("BLOOMFILTER_BIT", 30),
                 hash_number=spider.settings.getint("BLOOMFILTER_HASH_NUMBER", 6),
+                **get_dupefilter_params(spider.settings)
             )
         except TypeError as e:
             raise ValueError("Failed to instantiate dupefilter class '%s': %s", self.dupefilter_cls, e)
@@ -158,6 +159,9 @@ class Scheduler(object):
             spider.log("Resuming crawl (%d requests scheduled)" % len(self.queue))
 
     def close(self, reason):
+        # Write out fingerprints and stats the dupefilter still buffers.
+        if hasattr(self.df, "flush"):
+            self.df.flush()
         if not self.persist:
             self.flush()
 
@@ -174,6 +178,33 @@ class Scheduler(object):
         self.queue.push(request)
         return True
 
+    def enqueue_requests(self, requests):
+        """Enqueues a batch of requests, checking the dupefilter in one round trip.
+
+        Returns a list of bool, whether each request was enqueued.
+        """
+        requests = list(requests)
+        seen = [False] * len(requests)
+        indexes = [i for i, request in enumerate(requests) if not request.dont_filter]
+        if hasattr(self.df, "request_seen_many"):
+            results = self.df.request_seen_many([requests[i] for i in indexes])
+        else:
+            results = [self.df.request_seen(requests[i]) for i in indexes]
+        for i, request_seen in zip(indexes, results):
+            seen[i] = request_seen
+
+        enqueued = []
+        for request, request_seen in zip(requests, seen):
+            if request_seen:
+                self.df.log(request, self.spider)
+                enqueued.append(False)
+                continue
+            if self.stats:
+                self.stats.inc_value("scheduler/enqueued/redis", spider=self.spider)
+            self.queue.push(request)
+            enqueued.append(True)
+        return enqueued
+
     def next_request(self):
         block_pop_timeout = self.idle_before_close
         request = self.queue.pop(block_pop_timeout)
@@ -1,7 +1,14 @@
 # -*- coding: utf-8 -*-
+import re
 import six
+import weakref
+from collections import OrderedDict
+from functools import lru_cache
 from hashlib import md5
 
+from blake3 import blake3
+from w3lib.url import canonicalize_url
+
 
 def bytes_to_str(s, encoding="utf-8"):
     """Returns a str if a bytes object is given."""
@@ -17,6 +24,89 @@ def make_md5(text):
     return md5(str(text).encode('utf-8')).hexdigest()
 
 
+_fingerprint_cache = weakref.WeakKeyDictionary()
+
+
+@lru_cache(maxsize=1 << 16)
+def _canonical_url(url):
+    # Retries, redirects and repeated links create new requests for the same
+    # url, canonicalize_url is the costly part of fingerprinting them.
+    return canonicalize_url(url).encode("utf-8")
+
+
+def fingerprint(method, url, body=b""):
+    """
+    Returns a 16-byte BLAKE3 digest of the method, canonicalized url and body.
+    """
+    fp = blake3(method.encode("ascii"))
+    fp.update(_canonical_url(url))
+    fp.update(body or b"")
+    return fp.digest(length=16)
+
+
+def request_fingerprint(request):
+    """
+    Returns a 16-byte binary fingerprint of the request method, canonicalized url and body.
+    The fingerprint is cached for the lifetime of the request.
+    """
+    cached = _fingerprint_cache.get(request)
+    if cached is None:
+        cached = _fingerprint_cache[request] = fingerprint(request.method, request.url, request.body)
+    return cached
+
+
+# Content normalization for content_digest: drop scripts, styles, tag attributes,
+# digits (session ids, dates, counters) and whitespace before hashing.
+_SCRIPT_STYLE_RE = re.compile(rb"<(script|style)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_TAG_ATTRS_RE = re.compile(rb"<(/?[a-zA-Z][a-zA-Z0-9]*)[^>]*>")
+_DIGITS_RE = re.compile(rb"[0-9]+")
+_SPACES_RE = re.compile(rb"\s+")
+
+
+def content_digest(body):
+    """
+    Returns a 16-byte BLAKE3 digest of the normalized page body (bytes or str).
+    Pages that differ only in markup attributes, scripts, numbers or whitespace share a digest.
+    """
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    body = _SCRIPT_STYLE_RE.sub(b"", body)
+    body = _TAG_ATTRS_RE.sub(rb"<\1>", body)
+    body = _DIGITS_RE.sub(b"", body)
+    body = _SPACES_RE.sub(b"", body)
+    return blake3(body).digest(length=16)
+
+
+class LRUSet(object):
+    """
+    Size-bounded set that evicts the least recently used member, a maxsize of 0 keeps nothing.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def __contains__(self, item):
+        if item in self._data:
+            self._data.move_to_end(item)
+            return True
+        return False
+
+    def __len__(self):
+        return len(self._data)
+
+    def add(self, item):
+        if self.maxsize <= 0:
+            return
+        self._data[item] = None
+        self._data.move_to_end(item)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+
 def get_track_id(request):
     track_id = ''
     try: